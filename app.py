@@ -7,6 +7,12 @@ import requests
 import json
 from datetime import datetime, timedelta
 import random
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import Counter, OrderedDict
 from bson import ObjectId
 # import openai  # Removed OpenAI
 # import google.generativeai as genai  # For Gemini
@@ -30,6 +36,127 @@ WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 # Hugging Face API base URL for free inference
 HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models"
 
+# Cache and cache warmer settings
+CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 3600))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1000))
+WARM_CACHE_ENABLED = os.getenv('WARM_CACHE_ENABLED', 'true').lower() == 'true'
+WARM_CACHE_INTERVAL_SECONDS = int(os.getenv('WARM_CACHE_INTERVAL_SECONDS', 1800))
+WARM_CACHE_MAX_CALLS = int(os.getenv('WARM_CACHE_MAX_CALLS', 200))
+WARM_CACHE_TOP_N = int(os.getenv('WARM_CACHE_TOP_N', 15))
+WARM_CACHE_LOOKBACK_DAYS = int(os.getenv('WARM_CACHE_LOOKBACK_DAYS', 7))
+SEARCH_COUNTS_MAX_ENTRIES = 1000
+
+# Popular destinations, matching the ones generate_template_response knows about
+DEFAULT_HOT_DESTINATIONS = [
+    'Paris', 'Tokyo', 'New York', 'London',
+    'Rome', 'Barcelona', 'Amsterdam', 'Prague'
+]
+
+# In-memory LRU response cache: key -> (expires_at, value)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Recent successful destination searches, used to pick destinations to warm.
+# Counts are halved after every warm run so old traffic fades out.
+_search_counts = Counter()
+_search_counts_lock = threading.Lock()
+
+# Per-thread flag set when a lookup fell back or partially failed,
+# so neither it nor any cached lookup wrapping it gets stored
+_cache_state = threading.local()
+
+# Upstream call accounting for the warmer thread
+_warm_state = threading.local()
+
+class WarmBudgetExhausted(Exception):
+    """Raised when the cache warmer has used up an upstream API's call budget"""
+
+def skip_cache():
+    """Mark the current lookup as not cacheable"""
+    _cache_state.skip = True
+
+def spend_warm_budget(api):
+    """Count one upstream call to ``api`` made by the cache warmer.
+
+    Each API (opentripmap, openweathermap, huggingface) has its own budget of
+    WARM_CACHE_MAX_CALLS per warm run. Outside the warmer this does nothing.
+    """
+    if not getattr(_warm_state, 'active', False):
+        return
+    if _warm_state.calls[api] >= WARM_CACHE_MAX_CALLS:
+        _warm_state.exhausted = True
+        raise WarmBudgetExhausted(f"{api} call budget used up")
+    _warm_state.calls[api] += 1
+
+def cache_size():
+    """Number of unexpired cache entries"""
+    now = time.time()
+    with _cache_lock:
+        return sum(1 for expires_at, _ in _cache.values() if expires_at > now)
+
+def _store(key, value):
+    now = time.time()
+    with _cache_lock:
+        for expired_key in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+            del _cache[expired_key]
+        _cache[key] = (now + CACHE_TTL_SECONDS, copy.deepcopy(value))
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def cached(func):
+    """Cache successful results of an upstream lookup for CACHE_TTL_SECONDS.
+
+    Error results (None, an empty list or a dict with an 'error' key) are not
+    cached, and neither is anything computed while a nested lookup failed or
+    called skip_cache(). The wrapped function gets a ``refresh`` method that
+    always fetches fresh data and stores it, which is what the cache warmer uses.
+    """
+    signature = inspect.signature(func)
+
+    def make_key(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return (func.__name__,) + tuple(
+            str(value).lower() if isinstance(value, str) else value
+            for value in bound.arguments.values()
+        )
+
+    def fetch_and_store(key, args, kwargs):
+        outer_skip = getattr(_cache_state, 'skip', False)
+        _cache_state.skip = False
+        failed = True
+        try:
+            value = func(*args, **kwargs)
+            failed = (
+                _cache_state.skip
+                or value is None
+                or value == []
+                or (isinstance(value, dict) and 'error' in value)
+            )
+            if not failed:
+                _store(key, value)
+        finally:
+            # A failed lookup also makes any lookup wrapping it uncacheable
+            _cache_state.skip = outer_skip or _cache_state.skip or failed
+        return value
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = make_key(args, kwargs)
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry and entry[0] > time.time():
+                _cache.move_to_end(key)
+                return copy.deepcopy(entry[1])
+        return fetch_and_store(key, args, kwargs)
+
+    def refresh(*args, **kwargs):
+        return fetch_and_store(make_key(args, kwargs), args, kwargs)
+
+    wrapper.refresh = refresh
+    return wrapper
+
 def get_ai_explanation(prompt, max_tokens=300):
     """Get AI-powered explanation using Hugging Face's free inference API"""
     try:
@@ -54,6 +181,7 @@ def get_ai_explanation(prompt, max_tokens=300):
             }
         }
         
+        spend_warm_budget('huggingface')
         response = requests.post(
             f"{HUGGINGFACE_API_URL}/{model_name}",
             headers=headers,
@@ -71,13 +199,16 @@ def get_ai_explanation(prompt, max_tokens=300):
                     return cleaned_text[:max_tokens]
             
             # Fallback to a simple template-based response
+            skip_cache()
             return generate_template_response(prompt)
         else:
             # If API fails, use template-based response
+            skip_cache()
             return generate_template_response(prompt)
     
     except Exception as e:
         print(f"AI API error: {e}")
+        skip_cache()
         return generate_template_response(prompt)
 
 def generate_template_response(prompt):
@@ -112,6 +243,7 @@ def generate_template_response(prompt):
         # Generic travel response
         return "This destination offers unique cultural experiences, local cuisine, historic landmarks, and beautiful scenery. Explore local markets, try traditional dishes, visit museums, and immerse yourself in the local culture. Don't forget to capture memories and enjoy the journey!"
 
+@cached
 def search_destinations(query, limit=10):
     """Search destinations using OpenTripMap API"""
     try:
@@ -127,6 +259,7 @@ def search_destinations(query, limit=10):
             'format': 'json'
         }
         
+        spend_warm_budget('opentripmap')
         response = requests.get(search_url, params=params)
         response.raise_for_status()
         
@@ -145,6 +278,7 @@ def search_destinations(query, limit=10):
         print(f"OpenTripMap API error: {e}")
         return {"error": f"Failed to search destinations: {str(e)}"}
 
+@cached
 def get_place_details(xid):
     """Get detailed information about a specific place"""
     try:
@@ -157,6 +291,7 @@ def get_place_details(xid):
             'format': 'json'
         }
         
+        spend_warm_budget('opentripmap')
         response = requests.get(details_url, params=params)
         response.raise_for_status()
         
@@ -189,6 +324,7 @@ def get_place_details(xid):
         print(f"Error getting place details: {e}")
         return None
 
+@cached
 def get_nearby_attractions(lat, lon, radius=5000, limit=10):
     """Get nearby attractions using OpenTripMap API"""
     try:
@@ -206,6 +342,7 @@ def get_nearby_attractions(lat, lon, radius=5000, limit=10):
             'kinds': 'cultural,historic,architecture,interesting_places'
         }
         
+        spend_warm_budget('opentripmap')
         response = requests.get(nearby_url, params=params)
         response.raise_for_status()
         
@@ -294,6 +431,7 @@ def generate_smart_itinerary(destination, duration, budget, preferences, travel_
         print(f"Error generating itinerary: {e}")
         return {"error": f"Failed to generate itinerary: {str(e)}"}
 
+@cached
 def get_weather_info(lat, lon):
     """Get weather information for the destination"""
     try:
@@ -309,6 +447,7 @@ def get_weather_info(lat, lon):
             'units': 'metric'
         }
         
+        spend_warm_budget('openweathermap')
         response = requests.get(weather_url, params=params)
         response.raise_for_status()
         
@@ -328,6 +467,110 @@ def get_weather_info(lat, lon):
 # OpenTripMap API base URL
 OPENTRIPMAP_BASE_URL = "https://api.opentripmap.com/0.1/en/places"
 
+# Cache warmer
+
+_last_warm = {'started_at': None, 'finished_at': None, 'destinations': [], 'calls': {}}
+
+def record_search(query):
+    """Count a successful destination search so popular queries get warmed"""
+    query = query.lower()
+    with _search_counts_lock:
+        if query not in _search_counts and len(_search_counts) >= SEARCH_COUNTS_MAX_ENTRIES:
+            del _search_counts[min(_search_counts, key=_search_counts.get)]
+        _search_counts[query] += 1
+
+def decay_search_counts():
+    """Halve search counts so only recent traffic stays popular"""
+    with _search_counts_lock:
+        for query in list(_search_counts):
+            _search_counts[query] //= 2
+            if not _search_counts[query]:
+                del _search_counts[query]
+
+def get_hot_destinations():
+    """Build the list of destinations to warm.
+
+    Uses WARM_CACHE_DESTINATIONS if set, otherwise the default popular
+    cities, followed by the most common destinations in recent itineraries
+    and search traffic.
+    """
+    configured = os.getenv('WARM_CACHE_DESTINATIONS')
+    if configured:
+        candidates = [name.strip() for name in configured.split(',') if name.strip()]
+    else:
+        candidates = list(DEFAULT_HOT_DESTINATIONS)
+
+    try:
+        cutoff = (datetime.now() - timedelta(days=WARM_CACHE_LOOKBACK_DAYS)).isoformat()
+        popular = db.itineraries.aggregate([
+            {'$match': {'created_at': {'$gte': cutoff}}},
+            {'$group': {'_id': {'$toLower': '$destination'}, 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1}},
+            {'$limit': WARM_CACHE_TOP_N}
+        ])
+        candidates.extend(doc['_id'] for doc in popular if doc.get('_id'))
+    except Exception as e:
+        print(f"Cache warmer could not read itineraries: {e}")
+
+    with _search_counts_lock:
+        candidates.extend(query for query, _ in _search_counts.most_common(WARM_CACHE_TOP_N))
+
+    destinations = []
+    seen = set()
+    for name in candidates:
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            destinations.append(name)
+    return destinations[:WARM_CACHE_TOP_N]
+
+def warm_destination(destination):
+    """Prefetch search results, details, nearby attractions and weather for a destination"""
+    # Both the search endpoint (limit=10) and itinerary generation (limit=5) are warmed;
+    # the second mostly reuses the place details fetched by the first.
+    results = search_destinations.refresh(destination, limit=10)
+    search_destinations.refresh(destination, limit=5)
+    if not isinstance(results, list) or not results:
+        return
+
+    coordinates = results[0]['coordinates']
+    get_nearby_attractions.refresh(coordinates['lat'], coordinates['lon'])
+    get_weather_info.refresh(coordinates['lat'], coordinates['lon'])
+
+def warm_cache():
+    """Warm the cache for hot destinations within each API's WARM_CACHE_MAX_CALLS budget"""
+    _warm_state.active = True
+    _warm_state.exhausted = False
+    _warm_state.calls = Counter()
+    _last_warm['started_at'] = datetime.now().isoformat()
+    warmed = []
+    try:
+        for destination in get_hot_destinations():
+            try:
+                warm_destination(destination)
+            except Exception as e:
+                print(f"Cache warmer failed for {destination}: {e}")
+            if _warm_state.exhausted:
+                print("Cache warmer stopped: upstream call budget used up")
+                break
+            warmed.append(destination)
+    finally:
+        _warm_state.active = False
+        decay_search_counts()
+        _last_warm['finished_at'] = datetime.now().isoformat()
+        _last_warm['destinations'] = warmed
+        _last_warm['calls'] = dict(_warm_state.calls)
+
+def start_cache_warmer():
+    """Warm the cache now and then every WARM_CACHE_INTERVAL_SECONDS in a background thread"""
+    def run():
+        while True:
+            warm_cache()
+            time.sleep(WARM_CACHE_INTERVAL_SECONDS)
+
+    thread = threading.Thread(target=run, name='cache-warmer', daemon=True)
+    thread.start()
+    return thread
+
 # API Endpoints
 
 @app.route('/api/health', methods=['GET'])
@@ -341,19 +584,25 @@ def health_check():
             'opentripmap': 'configured' if OPENTRIPMAP_API_KEY else 'not_configured',
             'huggingface': 'configured' if HUGGINGFACE_API_KEY else 'not_configured',
             'weather': 'configured' if WEATHER_API_KEY else 'not_configured'
+        },
+        'cache': {
+            'entries': cache_size(),
+            'last_warm': _last_warm
         }
     })
 
 @app.route('/api/destinations/search', methods=['GET'])
 def search_destinations_endpoint():
     """Search destinations by query"""
-    query = request.args.get('q', '')
+    query = request.args.get('q', '').strip()
     limit = request.args.get('limit', 10, type=int)
     
     if not query:
         return jsonify({'error': 'Query parameter "q" is required'}), 400
     
     results = search_destinations(query, limit)
+    if isinstance(results, list) and results:
+        record_search(query)
     return jsonify(results)
 
 @app.route('/api/destinations/<xid>/details', methods=['GET'])
@@ -539,4 +788,7 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    # With the debug reloader, only warm from the serving child process
+    if WARM_CACHE_ENABLED and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_cache_warmer()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
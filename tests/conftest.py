@@ -0,0 +1,11 @@
+import os
+import sys
+
+# app.py reads its configuration at import time
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017/?serverSelectionTimeoutMS=100')
+os.environ.setdefault('MONGODB_DB_NAME', 'travel_planner_test')
+os.environ.setdefault('OPENTRIPMAP_API_KEY', 'test-opentripmap-key')
+os.environ.setdefault('HUGGINGFACE_API_KEY', 'test-huggingface-key')
+os.environ.setdefault('WEATHER_API_KEY', 'test-weather-key')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
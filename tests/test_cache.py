@@ -0,0 +1,207 @@
+from collections import Counter
+
+import pytest
+import requests
+
+import app
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeUpstream:
+    """Stands in for OpenTripMap, OpenWeatherMap and Hugging Face"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.failing = set()
+        self.ai_status = 200
+
+    def get(self, url, params=None, **kwargs):
+        if 'autosuggest' in url:
+            kind = 'autosuggest'
+            data = [{'xid': 'A'}, {'xid': 'B'}]
+        elif '/xid/' in url:
+            kind = 'details'
+            data = {'name': 'Place', 'point': {'lat': 1.0, 'lon': 2.0}}
+        elif 'radius' in url:
+            kind = 'nearby'
+            data = {'features': [{'properties': {'name': 'Nearby'}, 'geometry': {}}]}
+        else:
+            kind = 'weather'
+            data = {
+                'main': {'temp': 20, 'humidity': 50},
+                'weather': [{'description': 'clear sky'}],
+                'wind': {'speed': 3}
+            }
+        self.calls[kind] += 1
+        if kind in self.failing:
+            return FakeResponse({}, status_code=500)
+        return FakeResponse(data)
+
+    def post(self, url, **kwargs):
+        self.calls['ai'] += 1
+        return FakeResponse([{'generated_text': 'A lovely place to visit.'}], self.ai_status)
+
+
+class FakeItineraries:
+    def __init__(self, destinations):
+        self.destinations = destinations
+
+    def aggregate(self, pipeline):
+        return [{'_id': name, 'count': 1} for name in self.destinations]
+
+
+class FakeDb:
+    def __init__(self, destinations):
+        self.itineraries = FakeItineraries(destinations)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(app.requests, 'get', fake.get)
+    monkeypatch.setattr(app.requests, 'post', fake.post)
+    monkeypatch.setattr(app, 'db', FakeDb([]))
+    app._cache.clear()
+    app._search_counts.clear()
+    yield fake
+    app._cache.clear()
+    app._search_counts.clear()
+
+
+def test_cache_hit_skips_upstream(upstream):
+    first = app.get_weather_info(1.0, 2.0)
+    second = app.get_weather_info(1.0, 2.0)
+
+    assert first == second
+    assert upstream.calls['weather'] == 1
+
+
+def test_cache_key_normalizes_defaults_and_case(upstream):
+    app.get_nearby_attractions(1.0, 2.0)
+    app.get_nearby_attractions(1.0, 2.0, 5000, 10)
+    app.search_destinations('Paris')
+    app.search_destinations('PARIS', limit=10)
+
+    assert upstream.calls['nearby'] == 1
+    assert upstream.calls['autosuggest'] == 1
+
+
+def test_refresh_bypasses_cache(upstream):
+    app.get_weather_info(1.0, 2.0)
+    app.get_weather_info.refresh(1.0, 2.0)
+
+    assert upstream.calls['weather'] == 2
+
+
+def test_errors_are_not_cached(upstream):
+    upstream.failing.add('weather')
+    assert 'error' in app.get_weather_info(1.0, 2.0)
+    assert 'error' in app.get_weather_info(1.0, 2.0)
+
+    assert upstream.calls['weather'] == 2
+
+
+def test_search_with_failed_details_is_not_cached(upstream):
+    upstream.failing.add('details')
+    assert app.search_destinations('Paris') == []
+    app.search_destinations('Paris')
+
+    assert upstream.calls['autosuggest'] == 2
+
+
+def test_ai_fallback_is_not_cached(upstream):
+    upstream.ai_status = 503
+    details = app.get_place_details('A')
+    assert details['ai_description'] == app.generate_template_response('Place')
+
+    app.get_place_details('A')
+    assert upstream.calls['details'] == 2
+
+    upstream.ai_status = 200
+    app.get_place_details('A')
+    app.get_place_details('A')
+    assert upstream.calls['details'] == 3
+
+
+def test_entries_expire(upstream, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, 'time', lambda: now[0])
+
+    app.get_weather_info(1.0, 2.0)
+    now[0] += app.CACHE_TTL_SECONDS + 1
+    assert app.cache_size() == 0
+    app.get_weather_info(1.0, 2.0)
+
+    assert upstream.calls['weather'] == 2
+
+
+def test_cache_evicts_least_recently_used(upstream, monkeypatch):
+    monkeypatch.setattr(app, 'CACHE_MAX_ENTRIES', 2)
+
+    app.get_weather_info(1.0, 1.0)
+    app.get_weather_info(2.0, 2.0)
+    app.get_weather_info(1.0, 1.0)
+    app.get_weather_info(3.0, 3.0)
+
+    assert len(app._cache) == 2
+    app.get_weather_info(1.0, 1.0)
+    assert upstream.calls['weather'] == 3
+    app.get_weather_info(2.0, 2.0)
+    assert upstream.calls['weather'] == 4
+
+
+def test_hot_destinations_order_and_dedup(upstream, monkeypatch):
+    monkeypatch.setenv('WARM_CACHE_DESTINATIONS', 'Paris, Tokyo,')
+    monkeypatch.setattr(app, 'db', FakeDb(['tokyo', 'lisbon']))
+    app.record_search('Lisbon')
+    app.record_search('Oslo')
+    app.record_search('Oslo')
+
+    assert app.get_hot_destinations() == ['Paris', 'Tokyo', 'lisbon', 'oslo']
+
+
+def test_search_counts_decay(upstream):
+    for _ in range(3):
+        app.record_search('Oslo')
+    app.record_search('Lisbon')
+
+    app.decay_search_counts()
+
+    assert app._search_counts == Counter({'oslo': 1})
+
+
+def test_warm_cache_fills_cache(upstream, monkeypatch):
+    monkeypatch.setenv('WARM_CACHE_DESTINATIONS', 'Paris')
+
+    app.warm_cache()
+    calls_after_warm = sum(upstream.calls.values())
+    app.search_destinations('Paris')
+    app.search_destinations('paris', limit=5)
+    app.get_nearby_attractions(1.0, 2.0)
+    app.get_weather_info(1.0, 2.0)
+
+    assert app._last_warm['destinations'] == ['Paris']
+    assert sum(upstream.calls.values()) == calls_after_warm
+
+
+def test_warm_cache_stops_at_budget(upstream, monkeypatch):
+    monkeypatch.setenv('WARM_CACHE_DESTINATIONS', 'Paris,Tokyo,London')
+    monkeypatch.setattr(app, 'WARM_CACHE_MAX_CALLS', 4)
+
+    app.warm_cache()
+
+    assert max(upstream.calls.values()) <= 4
+    assert max(app._last_warm['calls'].values()) <= 4
+    assert app._last_warm['destinations'] == []